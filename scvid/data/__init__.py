@@ -3,7 +3,7 @@ from .dadc_dataset import (
     IterableDistributedAnnDataCollectionDataset,
 )
 from .distributed_anndata import DistributedAnnDataCollection
-from .read import read_h5ad_file, read_h5ad_gcs, read_h5ad_local
+from .read import read_h5ad_file, read_h5ad_gcs, read_h5ad_local, rechunk_h5ad
 from .sampler import DistributedAnnDataCollectionSingleConsumerSampler, collate_fn
 from .schema import AnnDataSchema
 
@@ -17,4 +17,5 @@ __all__ = [
     "read_h5ad_file",
     "read_h5ad_gcs",
     "read_h5ad_local",
+    "rechunk_h5ad",
 ]
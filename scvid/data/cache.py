@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Set
+
+from anndata import AnnData
+from scipy.sparse import issparse
+
+
+def nbytes(adata: AnnData) -> int:
+    r"""
+    Estimate the memory footprint of an anndata object in bytes.
+
+    Accounts for the count data ``X`` (dense or sparse) and the ``.obs``
+    dataframe, which dominate the footprint of the shards buffered by
+    `DistributedAnnDataCollection`.
+
+    Args:
+        adata (AnnData): AnnData object.
+    """
+    size = 0
+    X = adata.X
+    if X is not None:
+        if issparse(X):
+            size += X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+        else:
+            size += X.nbytes
+    size += adata.obs.memory_usage(deep=True).sum()
+    return int(size)
+
+
+class SizedLRU:
+    r"""
+    Least-recently-used cache bounded by the total size in bytes of its values.
+
+    Unlike a count-bounded LRU, the eviction policy tracks the actual memory
+    footprint of the cached anndata objects, so collections with shards of
+    varying ``n_obs`` neither run out of memory nor under-utilize the budget.
+
+    Mirrors the part of the :class:`boltons.cacheutils.LRU` API used by
+    `DistributedAnnDataCollection`: item access refreshes recency, insertion
+    evicts least-recently-used entries until the total size fits within
+    ``max_bytes``, and failed lookups increment ``miss_count``.
+
+    Args:
+        max_bytes (int): Maximum total size in bytes of the cached values.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.miss_count = 0
+        self._cache: "OrderedDict[Any, AnnData]" = OrderedDict()
+        self._sizes: Dict[Any, int] = {}
+        self._protected: Set[Any] = set()
+
+    @contextmanager
+    def protect(self, keys: Iterable[Any]):
+        r"""
+        Exempt ``keys`` from eviction for the duration of the context.
+
+        Used by `DistributedAnnDataCollection.materialize` so that inserting one
+        shard of a multi-shard batch cannot evict another shard of the same
+        batch before it is returned.
+        """
+        keys = set(keys) - self._protected
+        self._protected |= keys
+        try:
+            yield
+        finally:
+            self._protected -= keys
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __iter__(self):
+        return iter(self._cache)
+
+    def __getitem__(self, key: Any) -> AnnData:
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self.miss_count += 1
+            raise
+        self._cache.move_to_end(key)
+        return value
+
+    def get(self, key: Any, default: Optional[AnnData] = None) -> Optional[AnnData]:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: Any, value: AnnData) -> None:
+        if key in self._cache:
+            self.total_bytes -= self._sizes.pop(key)
+            del self._cache[key]
+        self._cache[key] = value
+        self._sizes[key] = nbytes(value)
+        self.total_bytes += self._sizes[key]
+        # evict least-recently-used entries but keep the new one and any
+        # protected entries; evicted values are returned to the garbage
+        # collector untouched since callers may still hold references to them
+        while self.total_bytes > self.max_bytes and len(self._cache) > 1:
+            evicted_key = next(
+                (k for k in self._cache if k != key and k not in self._protected),
+                None,
+            )
+            if evicted_key is None:
+                break
+            del self._cache[evicted_key]
+            self.total_bytes -= self._sizes.pop(evicted_key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._sizes.clear()
+        self.total_bytes = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(max_bytes={self.max_bytes}, "
+            f"total_bytes={self.total_bytes}, size={len(self)})"
+        )
@@ -1,6 +1,11 @@
-from contextlib import contextmanager
-from typing import List, Optional, Sequence, Tuple, Union
-
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 import pandas as pd
 from anndata import AnnData
 from anndata._core.index import Index, _normalize_indices
@@ -12,9 +17,44 @@ from anndata.experimental.multi_files._anncollection import (
 from boltons.cacheutils import LRU, cachedproperty
 from braceexpand import braceexpand
 
+from .cache import SizedLRU
 from .read import read_h5ad_file
 from .schema import AnnDataSchema
 
+_RESOLVE_CACHE_MAXSIZE = 1024
+# indices larger than this are not worth hashing for the resolve cache
+_INDEX_KEY_MAX_SIZE = 1024
+
+
+def _index_key(index: Index) -> Optional[tuple]:
+    """Return a hashable cache key for an index, or `None` if the index is not cacheable."""
+    if isinstance(index, (int, np.integer)):
+        return (int, int(index))
+    if isinstance(index, slice):
+        # slice objects are not hashable before Python 3.12
+        return (slice, index.start, index.stop, index.step)
+    if isinstance(index, tuple):
+        keys = tuple(_index_key(e) for e in index)
+        if any(key is None for key in keys):
+            return None
+        return (tuple, keys)
+    if isinstance(index, list) and len(index) <= _INDEX_KEY_MAX_SIZE:
+        if any(type(e) is bool for e in index):
+            # bool is a subclass of int, but a boolean mask and the equal-valued
+            # integer positions resolve to different rows
+            return None
+        if all(isinstance(e, (int, np.integer)) for e in index):
+            return (list, tuple(int(e) for e in index))
+        return None
+    if isinstance(index, np.ndarray) and index.size <= _INDEX_KEY_MAX_SIZE:
+        if index.dtype == object:
+            # tobytes() of an object array serializes pointers, not values,
+            # so equal arrays would not collide and reused buffers with
+            # different contents would
+            return None
+        return (np.ndarray, index.dtype.str, index.shape, index.tobytes())
+    return None
+
 
 class getattr_mode:
     lazy = False
@@ -54,8 +94,12 @@ class DistributedAnnDataCollection(AnnCollection):
         filenames: Names of anndata files.
         limits: Limits of cell indices.
         shard_size: Shard size.
-        max_cache_size: Max size of the cache.
+        max_cache_size: Max size of the cache in number of anndata files.
+        max_cache_bytes: Max size of the cache in bytes of buffered anndata files.
+            If set, a bytes-aware LRU cache is used instead of the count-based one,
+            which keeps the memory footprint bounded when shards vary in `n_obs`.
         cache_size_strictly_enforced: Assert that the number of retrieved anndatas is not more than maxsize.
+            Only applies to the count-based cache.
         label: Column in `.obs` to place batch information in. If it's None, no column is added.
         keys: Names for each object being added. These values are used for column values for
             `label` or appended to the index if `index_unique` is not `None`. Defaults to filenames.
@@ -72,6 +116,21 @@ class DistributedAnnDataCollection(AnnCollection):
             This parameter can be set to `False` if the order in the returned arrays
             is not important, for example, when using them for stochastic gradient descent.
             In this case the performance of subsetting can be a bit better.
+        block_size: Size in bytes of the buffered read blocks used when fetching
+            anndata files from Cloud Storage (see :func:`read_h5ad_gcs`).
+            If `None`, the default block size is used.
+        prefetch_next: If `True`, `__getitem__` submits a background read for the
+            shard following the last one it materialized. Only useful for
+            sequential access; with a shuffled sampler the guess is usually wrong
+            and the prefetched files are wasted.
+        parallel_load: If `True`, uncached anndata files are loaded in worker
+            processes when `materialize` needs more than one of them. hdf5
+            serializes all library calls behind a single global lock, so threads
+            cannot read shards concurrently; separate processes with independent
+            file handles can.
+        prewarm: If set, background reads for the first `min(prewarm, max_cache_size)`
+            anndata files are submitted at construction time, overlapping shard I/O
+            with trainer setup which is otherwise spent waiting.
     """
 
     def __init__(
@@ -80,12 +139,17 @@ class DistributedAnnDataCollection(AnnCollection):
         limits: Optional[Sequence[int]] = None,
         shard_size: Optional[int] = None,
         max_cache_size: Optional[int] = None,
+        max_cache_bytes: Optional[int] = None,
         cache_size_strictly_enforced: bool = True,
         label: Optional[str] = None,
         keys: Optional[Sequence[str]] = None,
         index_unique: Optional[str] = None,
         convert: Optional[ConvertType] = None,
         indices_strict: bool = True,
+        block_size: Optional[int] = None,
+        prefetch_next: bool = False,
+        parallel_load: bool = False,
+        prewarm: Optional[int] = None,
     ):
         if isinstance(filenames, str):
             filenames = braceexpand(filenames)
@@ -101,15 +165,36 @@ class DistributedAnnDataCollection(AnnCollection):
             limits = list(limits)
         assert len(limits) == len(self.filenames)
         # lru cache
-        self.cache = LRU(max_cache_size)
         self.max_cache_size = max_cache_size
+        self.max_cache_bytes = max_cache_bytes
+        self.cache = self._make_cache()
         self.cache_size_strictly_enforced = cache_size_strictly_enforced
+        self.block_size = block_size
+        read_kwargs = {} if block_size is None else {"block_size": block_size}
+        # background prefetching of anndata files
+        self.prefetch_next = prefetch_next
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=2)
+        self._prefetch_futures: Dict[str, Future] = {}
+        # parallel loading of anndata files
+        self.parallel_load = parallel_load
+        self._load_executor = self._make_load_executor()
+        # memoized index resolution
+        self._resolve_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
         # schema
-        adata0 = self.cache[self.filenames[0]] = read_h5ad_file(self.filenames[0])
+        adata0 = self.cache[self.filenames[0]] = read_h5ad_file(
+            self.filenames[0], **read_kwargs
+        )
         self.schema = AnnDataSchema(adata0)
         # lazy anndatas
         lazy_adatas = [
-            LazyAnnData(filename, (start, end), self.schema, self.cache)
+            LazyAnnData(
+                filename,
+                (start, end),
+                self.schema,
+                self.cache,
+                block_size,
+                self._prefetch_futures,
+            )
             for start, end, filename in zip([0] + limits, limits, self.filenames)
         ]
         # use filenames as default keys
@@ -129,16 +214,44 @@ class DistributedAnnDataCollection(AnnCollection):
                 harmonize_dtypes=False,
                 indices_strict=indices_strict,
             )
+        self.prewarm = prewarm
+        self._prewarm()
 
     def __getitem__(self, index: Index) -> AnnCollectionView:
-        oidx, vidx = _normalize_indices(index, self.obs_names, self.var_names)
-        resolved_idx = self._resolve_idx(oidx, vidx)
-        adatas_indices = [i for i, e in enumerate(resolved_idx[0]) if e is not None]
+        key = _index_key(index)
+        if key is None:
+            resolved_idx, adatas_indices = self._resolve(index)
+        else:
+            try:
+                resolved_idx, adatas_indices = self._resolve_cache[key]
+                self._resolve_cache.move_to_end(key)
+            except KeyError:
+                resolved_idx, adatas_indices = self._resolve(index)
+                self._resolve_cache[key] = (resolved_idx, adatas_indices)
+                if len(self._resolve_cache) > _RESOLVE_CACHE_MAXSIZE:
+                    self._resolve_cache.popitem(last=False)
         # TODO: materialize at the last moment?
         self.materialize(adatas_indices)
+        # prefetch the next shard in the background while this one is consumed
+        if self.prefetch_next and len(adatas_indices) > 0:
+            next_idx = int(adatas_indices[-1]) + 1
+            if next_idx < len(self.adatas):
+                self.prefetch(next_idx)
 
         return AnnCollectionView(self, self.convert, resolved_idx)
 
+    def _resolve(self, index: Index) -> Tuple[tuple, Sequence[int]]:
+        """Normalize and resolve an index into per-shard indices."""
+        oidx, vidx = _normalize_indices(index, self.obs_names, self.var_names)
+        resolved_idx = self._resolve_idx(oidx, vidx)
+        if len(resolved_idx[0]) > 64:
+            adatas_indices = np.flatnonzero(
+                np.array([e is not None for e in resolved_idx[0]])
+            )
+        else:
+            adatas_indices = [i for i, e in enumerate(resolved_idx[0]) if e is not None]
+        return resolved_idx, adatas_indices
+
     def materialize(self, indices: Union[int, Sequence[int]]) -> List[AnnData]:
         """
         Buffer and return anndata files at given indices from the list of lazy anndatas.
@@ -147,23 +260,115 @@ class DistributedAnnDataCollection(AnnCollection):
         """
         if isinstance(indices, int):
             indices = (indices,)
-        if self.cache_size_strictly_enforced:
+        if self.cache_size_strictly_enforced and self.max_cache_size is not None:
             assert len(indices) <= self.max_cache_size, (
                 f"Expected the number of anndata files ({len(indices)}) to be "
                 f"no more than the max cache size ({self.max_cache_size})."
             )
-        adatas = [None] * len(indices)
-        # first fetch cached anndata files
-        # this ensures that they are not popped if they were lru
-        for i, idx in enumerate(indices):
-            if self.adatas[idx].cached:
-                adatas[i] = self.adatas[idx].adata
-        # only then cache new anndata files
-        for i, idx in enumerate(indices):
-            if not self.adatas[idx].cached:
-                adatas[i] = self.adatas[idx].adata
+        adatas_list = self.adatas
+        cache = self.cache
+        lazy_adatas = [adatas_list[idx] for idx in indices]
+        # protect the shards of this batch from evicting one another
+        # while they are being inserted
+        filenames = [lazy_adata.filename for lazy_adata in lazy_adatas]
+        protect = (
+            cache.protect(filenames) if isinstance(cache, SizedLRU) else nullcontext()
+        )
+        with protect:
+            cached_mask = [adata.filename in cache for adata in lazy_adatas]
+            adatas = [None] * len(indices)
+            # first fetch cached anndata files with a single cache touch each
+            # this ensures that they are not popped if they were lru
+            for i, lazy_adata in enumerate(lazy_adatas):
+                if cached_mask[i]:
+                    adatas[i] = cache[lazy_adata.filename]
+            # only then cache new anndata files
+            uncached = [
+                (i, lazy_adata)
+                for i, lazy_adata in enumerate(lazy_adatas)
+                if not cached_mask[i]
+            ]
+            if self._load_executor is not None and len(uncached) > 1:
+                # load uncached shards in parallel worker processes, picking up
+                # in-flight prefetches instead of reading those files twice
+                read_kwargs = (
+                    {} if self.block_size is None else {"block_size": self.block_size}
+                )
+                futures = [
+                    self._prefetch_futures.pop(lazy_adata.filename, None)
+                    or self._load_executor.submit(
+                        read_h5ad_file, lazy_adata.filename, **read_kwargs
+                    )
+                    for _, lazy_adata in uncached
+                ]
+                for (i, lazy_adata), future in zip(uncached, futures):
+                    adatas[i] = lazy_adata._validate_and_cache(future.result())
+            else:
+                for i, lazy_adata in uncached:
+                    adatas[i] = lazy_adata.adata
         return adatas
 
+    def _prewarm(self) -> None:
+        """Submit background reads for the first shards, overlapping I/O with setup."""
+        if self.prewarm is None:
+            return
+        num_shards = min(self.prewarm, len(self.filenames))
+        if self.max_cache_size is not None:
+            num_shards = min(num_shards, self.max_cache_size)
+        self.prefetch(range(num_shards))
+
+    def _make_cache(self) -> Union[LRU, SizedLRU]:
+        if self.max_cache_bytes is not None:
+            return SizedLRU(self.max_cache_bytes)
+        return LRU(self.max_cache_size)
+
+    def _make_load_executor(self) -> Optional[ProcessPoolExecutor]:
+        if not self.parallel_load:
+            return None
+        if multiprocessing.current_process().daemon:
+            # daemonic processes (e.g. DataLoader workers) cannot have children;
+            # fall back to sequential loads there
+            return None
+        cpu_count = os.cpu_count() or 1
+        max_workers = min(self.max_cache_size or cpu_count, cpu_count)
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+    def __del__(self):
+        for executor in (
+            getattr(self, "_prefetch_executor", None),
+            getattr(self, "_load_executor", None),
+        ):
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def prefetch(self, indices: Union[int, Sequence[int]]) -> None:
+        """
+        Submit background reads for anndata files at given indices.
+
+        Prefetching hides the read latency behind compute on the currently
+        buffered shard. An in-flight read is picked up by `LazyAnnData.adata`
+        on first access instead of reading the file synchronously. Files that
+        are already cached or in flight are skipped, and the number of in-flight
+        reads is bounded by the cache size so that unconsumed prefetches cannot
+        exceed the memory budget.
+        """
+        if isinstance(indices, int):
+            indices = (indices,)
+        read_kwargs = {} if self.block_size is None else {"block_size": self.block_size}
+        max_in_flight = self.max_cache_size if self.max_cache_size is not None else 2
+        for idx in indices:
+            lazy_adata = self.adatas[idx]
+            filename = lazy_adata.filename
+            if lazy_adata.cached or filename in self._prefetch_futures:
+                continue
+            # expire the oldest unconsumed prefetch to stay within the bound
+            while len(self._prefetch_futures) >= max_in_flight:
+                stale = self._prefetch_futures.pop(next(iter(self._prefetch_futures)))
+                stale.cancel()
+            self._prefetch_futures[filename] = self._prefetch_executor.submit(
+                read_h5ad_file, filename, **read_kwargs
+            )
+
     def __repr__(self) -> str:
         n_obs, n_vars = self.shape
         descr = f"DistributedAnnDataCollection object with n_obs × n_vars = {self.n_obs} × {self.n_vars}"
@@ -172,31 +377,61 @@ class DistributedAnnDataCollection(AnnCollection):
             if len(keys) > 0:
                 descr += f"\n    view of {attr}: {str(keys)[1:-1]}"
         for attr in self._attrs:
-            keys = list(getattr(self, attr).keys())
+            keys = getattr(self, attr).keys()
             if len(keys) > 0:
-                descr += f"\n    {attr}: {str(keys)[1:-1]}"
+                descr += f"\n    {attr}: {str(list(keys))[1:-1]}"
         if "obs" in self._view_attrs_keys:
-            keys = list(self.obs.keys())
+            keys = self.obs.keys()
             if len(keys) > 0:
-                descr += f"\n    own obs: {str(keys)[1:-1]}"
+                descr += f"\n    own obs: {str(list(keys))[1:-1]}"
 
         return descr
 
+    @property
+    def adatas(self) -> List["LazyAnnData"]:
+        """List of lazy anndatas, constructed on first access after unpickling."""
+        if self._adatas is None:
+            self._adatas = [
+                LazyAnnData(
+                    filename,
+                    (start, end),
+                    self.schema,
+                    self.cache,
+                    self.block_size,
+                    self._prefetch_futures,
+                )
+                for start, end, filename in zip(
+                    [0] + self.limits, self.limits, self.filenames
+                )
+            ]
+        return self._adatas
+
+    @adatas.setter
+    def adatas(self, adatas: List["LazyAnnData"]) -> None:
+        self._adatas = adatas
+
     def __getstate__(self):
         state = self.__dict__.copy()
         del state["cache"]
-        del state["adatas"]
+        del state["_adatas"]
+        del state["_prefetch_executor"]
+        del state["_prefetch_futures"]
+        del state["_load_executor"]
+        del state["_resolve_cache"]
         return state
 
     def __setstate__(self, state):
         self.__dict__.update(state)
-        self.cache = LRU(self.max_cache_size)
-        self.adatas = [
-            LazyAnnData(filename, (start, end), self.schema, self.cache)
-            for start, end, filename in zip(
-                [0] + self.limits, self.limits, self.filenames
-            )
-        ]
+        self.cache = self._make_cache()
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=2)
+        self._prefetch_futures = {}
+        self._load_executor = self._make_load_executor()
+        self._resolve_cache = OrderedDict()
+        # defer shard-list construction until first access; this makes
+        # unpickling in DDP and dataloader workers near-instant.
+        # prewarming is deliberately not repeated here: every dataloader worker
+        # unpickles its own copy and would otherwise re-read the first shards
+        self._adatas = None
 
 
 class LazyAnnData:
@@ -209,7 +444,12 @@ class LazyAnnData:
         filename (str): Name of anndata file.
         limits (Tuple[int, int]): Limits of cell indices (inclusive, exclusive).
         schema (AnnDataSchema): Schema used as a reference for lazy attributes.
-        cache (LRU): Shared LRU cache storing buffered anndatas.
+        cache (Union[LRU, SizedLRU]): Shared LRU cache storing buffered anndatas.
+        block_size (Optional[int]): Size in bytes of the buffered read blocks used
+            when fetching the anndata file from Cloud Storage (see :func:`read_h5ad_gcs`).
+            If `None`, the default block size is used.
+        prefetch_futures (Optional[Dict[str, Future]]): Shared mapping of in-flight
+            background reads keyed by filename (see `DistributedAnnDataCollection.prefetch`).
     """
 
     _lazy_attrs = ["obs", "obsm", "layers", "var", "varm", "varp", "var_names"]
@@ -229,7 +469,9 @@ class LazyAnnData:
         filename: str,
         limits: Tuple[int, int],
         schema: AnnDataSchema,
-        cache: Optional[LRU] = None,
+        cache: Optional[Union[LRU, SizedLRU]] = None,
+        block_size: Optional[int] = None,
+        prefetch_futures: Optional[Dict[str, Future]] = None,
     ):
         self.filename = filename
         self.limits = limits
@@ -237,6 +479,9 @@ class LazyAnnData:
         if cache is None:
             cache = LRU()
         self.cache = cache
+        self.block_size = block_size
+        self.prefetch_futures = prefetch_futures
+        self._repr_cache: Optional[Tuple[bool, str]] = None
 
     @property
     def n_obs(self) -> int:
@@ -253,7 +498,8 @@ class LazyAnnData:
     @cachedproperty
     def obs_names(self) -> pd.Index:
         """This is different from the backed anndata"""
-        return pd.Index([f"cell_{i}" for i in range(*self.limits)])
+        # vectorized string construction is much faster than a list comprehension
+        return pd.Index(np.char.add("cell_", np.arange(*self.limits).astype(str)))
 
     @property
     def cached(self) -> bool:
@@ -265,16 +511,30 @@ class LazyAnnData:
         try:
             adata = self.cache[self.filename]
         except KeyError:
-            # fetch anndata
-            adata = read_h5ad_file(self.filename)
-            # validate anndata
-            assert self.n_obs == adata.n_obs, (
-                "Expected n_obs for LazyAnnData object and backed anndata to match "
-                f"but found {self.n_obs} and {adata.n_obs}, respectively."
+            # pick up an in-flight prefetch or fetch anndata
+            future = (
+                self.prefetch_futures.pop(self.filename, None)
+                if self.prefetch_futures is not None
+                else None
             )
-            self.schema.validate_anndata(adata)
-            # cache anndata
-            self.cache[self.filename] = adata
+            if future is not None:
+                adata = future.result()
+            else:
+                read_kwargs = (
+                    {} if self.block_size is None else {"block_size": self.block_size}
+                )
+                adata = read_h5ad_file(self.filename, **read_kwargs)
+            adata = self._validate_and_cache(adata)
+        return adata
+
+    def _validate_and_cache(self, adata: AnnData) -> AnnData:
+        """Validate a freshly read anndata against the schema and cache it."""
+        assert self.n_obs == adata.n_obs, (
+            "Expected n_obs for LazyAnnData object and backed anndata to match "
+            f"but found {self.n_obs} and {adata.n_obs}, respectively."
+        )
+        self.schema.validate_anndata(adata)
+        self.cache[self.filename] = adata
         return adata
 
     def __getattr__(self, attr):
@@ -293,15 +553,23 @@ class LazyAnnData:
         return self.adata[idx]
 
     def __repr__(self) -> str:
-        if self.cached:
+        cached = self.cached
+        if self._repr_cache is not None and self._repr_cache[0] == cached:
+            return self._repr_cache[1]
+        if cached:
             buffered = "Cached "
         else:
             buffered = ""
         backed_at = f" backed at {str(self.filename)!r}"
         descr = f"{buffered}LazyAnnData object with n_obs × n_vars = {self.n_obs} × {self.n_vars}{backed_at}"
-        if self.cached:
-            for attr in self._all_attrs:
-                keys = getattr(self, attr).keys()
-                if len(keys) > 0:
-                    descr += f"\n    {attr}: {str(list(keys))[1:-1]}"
+        if cached:
+            # read the buffered anndata from the cache directly so that the repr
+            # never triggers a backing file read
+            adata = self.cache.get(self.filename)
+            if adata is not None:
+                for attr in self._all_attrs:
+                    keys = getattr(adata, attr).keys()
+                    if len(keys) > 0:
+                        descr += f"\n    {attr}: {str(list(keys))[1:-1]}"
+        self._repr_cache = (cached, descr)
         return descr
@@ -1,20 +1,33 @@
 import re
 from typing import Optional
 
+import h5py
+import numpy as np
 from anndata import AnnData, read_h5ad
+from anndata.experimental import read_elem
 from google.cloud.storage import Client
 
 
-def read_h5ad_gcs(filename: str, storage_client: Optional[Client] = None) -> AnnData:
+def read_h5ad_gcs(
+    filename: str,
+    storage_client: Optional[Client] = None,
+    block_size: Optional[int] = None,
+) -> AnnData:
     r"""
     Read `.h5ad`-formatted hdf5 file from the Google Cloud Storage.
 
+    The remote file is opened through a read-buffered reader so that the small
+    range requests issued by hdf5 are coalesced into block-sized bulk reads,
+    which drastically reduces the number of round trips to the bucket.
+
     Example::
 
         >>> adata = read_h5ad_gcs("gs://dsp-cell-annotation-service/benchmark_v1/benchmark_v1.000.h5ad")
 
     Args:
         filename (str): Path to the data file in Cloud Storage.
+        block_size (Optional[int]): Size in bytes of the buffered read blocks.
+            If `None`, the library default (40 MiB) is used.
     """
     assert filename.startswith("gs:")
     # parse bucket and blob names from the filename
@@ -27,10 +40,91 @@ def read_h5ad_gcs(filename: str, storage_client: Optional[Client] = None) -> Ann
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
 
-    with blob.open("rb") as f:
+    open_kwargs = {} if block_size is None else {"chunk_size": block_size}
+    with blob.open("rb", **open_kwargs) as f:
         return read_h5ad(f)
 
 
+def rechunk_h5ad(
+    filename: str,
+    chunk_rows: Optional[int] = None,
+    compression: Optional[str] = "lzf",
+) -> None:
+    r"""
+    Rewrite the dense ``X`` dataset of an ``.h5ad`` file with row-aligned chunks.
+
+    `DistributedAnnDataCollection` reads random subsets of cells (rows) across
+    all genes, so the matching chunk layout is ``(chunk_rows, n_vars)`` with
+    chunks of roughly 1 MiB. Column-wise or small square chunks force every row
+    access to decompress many chunks and discard most of their contents. Run
+    this once per shard as a preprocessing step before training.
+
+    Args:
+        filename (str): Path to the local h5ad file, modified in place.
+        chunk_rows (Optional[int]): Number of rows per chunk. Defaults to the
+            largest row count that keeps chunks at about 1 MiB.
+        compression (Optional[str]): Compression filter for the rewritten
+            dataset. Default: ``"lzf"``, which decompresses much faster than gzip.
+    """
+    with h5py.File(filename, mode="r+") as f:
+        dset = f["X"]
+        if not isinstance(dset, h5py.Dataset):
+            raise ValueError(
+                f"Expected {filename!r} to store a dense X dataset "
+                "but found a group (sparse X)."
+            )
+        n_obs, n_vars = dset.shape
+        if chunk_rows is None:
+            chunk_rows = max(1, 1_000_000 // (n_vars * dset.dtype.itemsize))
+        chunk_rows = min(chunk_rows, n_obs)
+        X = np.empty(dset.shape, dtype=dset.dtype)
+        dset.read_direct(X)
+        # preserve anndata encoding attributes of X
+        dset_attrs = dict(dset.attrs)
+        del f["X"]
+        dset = f.create_dataset(
+            "X", data=X, chunks=(chunk_rows, n_vars), compression=compression
+        )
+        dset.attrs.update(dset_attrs)
+
+
+def _read_h5ad_read_direct(filename: str) -> AnnData:
+    r"""
+    Read `.h5ad`-formatted hdf5 file with a preallocated dense ``X``.
+
+    h5py's default read path element-fills a freshly allocated array, which is
+    several times slower for chunked datasets than allocating the array up front
+    and filling it with ``Dataset.read_direct``. Files with a sparse ``X``
+    (stored as a group) or a ``raw`` section fall back to :func:`anndata.read_h5ad`.
+
+    Args:
+        filename (str): Path to the local data file.
+    """
+    with h5py.File(filename, mode="r", rdcc_nbytes=64 * 1024 * 1024) as f:
+        dset = f["X"]
+        if isinstance(dset, h5py.Dataset) and "raw" not in f:
+            X = np.empty(dset.shape, dtype=dset.dtype)
+            dset.read_direct(X)
+            attrs = {
+                attr: read_elem(f[attr])
+                for attr in (
+                    "obs",
+                    "var",
+                    "uns",
+                    "obsm",
+                    "varm",
+                    "layers",
+                    "obsp",
+                    "varp",
+                )
+                if attr in f
+            }
+            # pass the on-disk dtype explicitly; the AnnData constructor
+            # otherwise converts X to its float32 default
+            return AnnData(X=X, dtype=X.dtype, **attrs)
+    return read_h5ad(filename)
+
+
 def read_h5ad_local(filename: str) -> AnnData:
     r"""
     Read `.h5ad`-formatted hdf5 file from the local disk.
@@ -40,7 +134,7 @@ def read_h5ad_local(filename: str) -> AnnData:
     """
     assert filename.startswith("file:")
     filename = re.sub(r"^file://?", "", filename)
-    return read_h5ad(filename)
+    return _read_h5ad_read_direct(filename)
 
 
 def read_h5ad_file(filename: str, **kwargs) -> AnnData:
@@ -49,6 +143,7 @@ def read_h5ad_file(filename: str, **kwargs) -> AnnData:
 
     Args:
         filename (str): Path to the data file.
+        kwargs: Keyword arguments passed to :func:`read_h5ad_gcs` for Cloud Storage paths.
     """
     if filename.startswith("gs:"):
         return read_h5ad_gcs(filename, **kwargs)
@@ -56,4 +151,4 @@ def read_h5ad_file(filename: str, **kwargs) -> AnnData:
     if filename.startswith("file:"):
         return read_h5ad_local(filename)
 
-    return read_h5ad(filename)
+    return _read_h5ad_read_direct(filename)
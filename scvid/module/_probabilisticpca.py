@@ -85,6 +85,9 @@ class ProbabilisticPCAPyroModule(PyroModule):
                 "ppca_flavor must be one of 'marginalized' or 'diagonal_normal' or 'multivariate_normal'"
             )
 
+    # fixed batch schema; lets the training plan specialize batch-args extraction
+    _fn_arg_keys = ("X",)
+
     @staticmethod
     def _get_fn_args_from_batch(
         tensor_dict: Dict[str, torch.Tensor]
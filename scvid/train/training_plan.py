@@ -1,10 +1,29 @@
-from typing import Optional
+import operator
+from typing import Dict, Optional, Tuple
 
 import pyro
 import pytorch_lightning as pl
 import torch
 
 
+class _ItemGetterExtractor:
+    """
+    Extract model/guide args from a batch via a fixed set of keys.
+
+    Specializes `_get_fn_args_from_batch` for modules with a fixed batch schema
+    (declared through a ``_fn_arg_keys`` attribute): extraction reduces to a
+    single C-level ``operator.itemgetter`` call with no Python dispatch.
+    """
+
+    def __init__(self, keys: Tuple[str, ...]) -> None:
+        self._getter = operator.itemgetter(*keys)
+        self._single = len(keys) == 1
+
+    def __call__(self, batch: Dict[str, torch.Tensor]) -> Tuple[tuple, dict]:
+        values = self._getter(batch)
+        return (values,) if self._single else values, {}
+
+
 class PyroTrainingPlan(pl.LightningModule):
     """
     Lightning module task to train Pyro scvi-tools modules.
@@ -41,12 +60,29 @@ class PyroTrainingPlan(pl.LightningModule):
         )
         self.optim = torch.optim.Adam if optim is None else optim
 
+        # bind the batch-args extractor once outside the training hot loop
+        fn_arg_keys = getattr(pyro_module, "_fn_arg_keys", None)
+        if fn_arg_keys is not None:
+            self._extract = _ItemGetterExtractor(tuple(fn_arg_keys))
+        else:
+            self._extract = pyro_module._get_fn_args_from_batch
+
     def training_step(self, batch, batch_idx):
         """Training step for Pyro training."""
-        args, kwargs = self.module._get_fn_args_from_batch(batch)
+        args, kwargs = self._extract(batch)
         loss = self.loss_fn(self.module.model, self.module.guide, *args, **kwargs)
-        # Logging to TensorBoard by default
-        self.log("train_loss", loss)
+        # Logging to TensorBoard by default. Log the detached loss on epoch only
+        # so that the logger neither retains the autograd graph nor forces a
+        # device sync on every step.
+        self.log(
+            "train_loss",
+            loss.detach(),
+            on_step=False,
+            on_epoch=True,
+            prog_bar=False,
+            logger=True,
+            sync_dist=False,
+        )
         return loss
 
     def configure_optimizers(self):
@@ -11,6 +11,8 @@ from scvid.data import (
     DistributedAnnDataCollectionDataset,
     read_h5ad_file,
 )
+from scvid.data.cache import SizedLRU, nbytes
+from scvid.data.distributed_anndata import _index_key
 
 
 @pytest.fixture
@@ -160,3 +162,67 @@ def test_pickle_dataset(dat):
     assert len(new_dataset.dadc.cache) == 0
 
     np.testing.assert_array_equal(new_dataset[:2]["X"], dataset[:2]["X"])
+
+
+def test_sized_lru(adt):
+    cache = SizedLRU(max_bytes=2 * nbytes(adt))
+
+    for i in range(3):
+        cache[i] = adt.copy()
+
+    # least-recently-used entry is evicted to fit the byte budget
+    assert len(cache) == 2
+    assert cache.total_bytes <= 2 * nbytes(adt)
+    assert 0 not in cache
+
+    cache[1]
+    assert cache.miss_count == 0
+    cache.get(0)
+    assert cache.miss_count == 1
+
+    # evicted values are left intact for callers still holding references
+    evicted, _ = cache[1], cache[2]
+    cache[3] = adt.copy()
+    assert 1 not in cache
+    assert evicted.X is not None
+
+    # protected entries survive insertions that would otherwise evict them
+    with cache.protect([2]):
+        cache[4] = adt.copy()
+        assert 2 in cache
+        assert 3 not in cache
+
+
+def test_max_cache_bytes(adatas_path, adt):
+    filenames = str(os.path.join(adatas_path, "adata.{000..002}.h5ad"))
+    limits = [2, 5, 10]
+    dat = DistributedAnnDataCollection(
+        filenames,
+        limits,
+        max_cache_bytes=2 * nbytes(adt),
+    )
+
+    for i in range(3):
+        dat.materialize(i)
+
+    assert dat.cache.total_bytes <= 2 * nbytes(adt)
+
+
+def test_resolve_cache(adatas_path, adt):
+    filenames = str(os.path.join(adatas_path, "adata.{000..002}.h5ad"))
+    limits = [2, 5, 10]
+    dat = DistributedAnnDataCollection(filenames, limits, max_cache_size=3)
+
+    oidx = np.array([1, 2, 4])
+    for _ in range(2):
+        np.testing.assert_array_equal(adt[oidx].X, dat[oidx].X)
+    # repeated identical indices resolve through a single memoized entry
+    assert len(dat._resolve_cache) == 1
+
+    # tobytes() of an object-dtype array serializes pointers, not values,
+    # so such indices must not be memoized
+    assert _index_key(np.array(["ref_cell001", "ref_cell002"], dtype=object)) is None
+
+    # bool is a subclass of int: a boolean-mask list must not share a key
+    # with the equal-valued integer-position list
+    assert _index_key([True, False, True]) is None
@@ -133,3 +133,20 @@ def test_onepass_mean_var_std_iterable_dataset(
     np.testing.assert_allclose(expected_mean, actual_mean, atol=1e-5)
     np.testing.assert_allclose(expected_var, actual_var, atol=1e-4)
     np.testing.assert_allclose(expected_std, actual_std, atol=1e-4)
+
+
+def test_onepass_load_state_dict(adata):
+    transform = ZScoreLog1pNormalize(
+        mean_g=0, std_g=None, perform_scaling=False, target_count=10_000
+    )
+    model = OnePassMeanVarStd(transform=transform)
+    model(torch.from_numpy(adata.X))
+
+    # loading a checkpoint into a freshly constructed module resizes the
+    # lazily initialized buffers
+    new_model = OnePassMeanVarStd(transform=transform)
+    new_model.load_state_dict(model.state_dict())
+
+    np.testing.assert_allclose(model.mean, new_model.mean)
+    np.testing.assert_allclose(model.var, new_model.var)
+    np.testing.assert_allclose(model.std, new_model.std)
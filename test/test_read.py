@@ -0,0 +1,33 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+from anndata import AnnData
+
+from scvid.data import read_h5ad_file, rechunk_h5ad
+
+
+@pytest.fixture
+def filename(tmp_path):
+    n_cell, g_gene = (10, 5)
+    rng = np.random.default_rng(1465)
+    X = rng.integers(10, size=(n_cell, g_gene))
+    adata = AnnData(X, dtype=X.dtype)
+    filename = os.path.join(tmp_path, "adata.h5ad")
+    adata.write(filename)
+    return filename
+
+
+@pytest.mark.parametrize("chunk_rows", [None, 4])
+def test_rechunk_h5ad(filename, chunk_rows):
+    adata = read_h5ad_file(filename)
+
+    rechunk_h5ad(filename, chunk_rows=chunk_rows)
+
+    with h5py.File(filename, mode="r") as f:
+        n_rows = f["X"].chunks[0] if chunk_rows is None else chunk_rows
+        assert f["X"].chunks == (n_rows, adata.n_vars)
+
+    rechunked_adata = read_h5ad_file(filename)
+    np.testing.assert_array_equal(adata.X, rechunked_adata.X)